@@ -8,17 +8,18 @@ Designed for Fortune-500 boards / asset managers: instant index, hotspot map, KP
 import streamlit as st
 import pandas as pd
 import numpy as np
-import plotly.express as px
 import io
 from datetime import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
+from xml.sax.saxutils import escape
 
 # -------------------------
 # Page config & light CSS
 # -------------------------
 st.set_page_config(page_title="Earth 3.0 — Live Twin (Demo)", layout="wide")
-st.markdown("""
+# Streamlit drops any element a rerun does not re-emit, so the style block has to be sent on every
+# run (a session_state "inject once" guard would unstyle the page after the first interaction);
+# keep it to the classes the page actually uses.
+PAGE_CSS = """
 <style>
 body {color:#0b1726}
 .header { font-size:22px; font-weight:700; color:#001F3F; }
@@ -26,15 +27,29 @@ body {color:#0b1726}
 .card { background:#fff; border-radius:12px; padding:14px; box-shadow:0 6px 20px rgba(8,28,50,0.06); }
 .kpi { font-size:20px; font-weight:700; color:#001F3F; }
 .small { color:#6b7280; }
-.alert-red { color: #b91c1c; font-weight:700; }
-.alert-green { color: #065f46; font-weight:700; }
 .footer { color: #6b7280; font-size:12px; }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(PAGE_CSS, unsafe_allow_html=True)
 
 # -------------------------
 # Fake dataset: 6 entities
 # -------------------------
+METRIC_COLS = ["Finance","AI Governance","Climate","Equity","Sustainability"]
+SCORE_COLS = METRIC_COLS + ["Earth3_Index"]
+# alerts: list entities with index < 65 or with AI Governance < 60 or Climate < 60
+ALERT_RULES = [
+    ("Earth3_Index", 65, "Low overall readiness", "Index"),
+    ("AI Governance", 60, "AI governance weak", "AI Gov"),
+    ("Climate", 60, "Climate resilience low", "Climate"),
+]
+
+def _widen_scores(df):
+    # scores are stored as float32; widen and re-round before values leave pandas, otherwise
+    # they surface as e.g. 72.5999984741211 in Python floats and Plotly hover labels
+    return df.astype({c: "float64" for c in SCORE_COLS}).round({c: 1 for c in SCORE_COLS})
+
+@st.cache_data
 def get_fake_orgs():
     # 6 sample orgs with lat/lon and metrics
     data = [
@@ -52,12 +67,36 @@ def get_fake_orgs():
          "Finance":75.0, "AI Governance":55.0, "Climate":68.0, "Equity":66.0, "Sustainability":70.0},
     ]
     df = pd.DataFrame(data)
+    # 0-100 scores with one decimal: float32 halves the bytes scanned by the means and masks
+    df[METRIC_COLS] = df[METRIC_COLS].astype("float32")
     # Earth 3.0 Index = average of five metrics
-    metric_cols = ["Finance","AI Governance","Climate","Equity","Sustainability"]
-    df["Earth3_Index"] = df[metric_cols].mean(axis=1).round(1)
-    return df
+    df["Earth3_Index"] = df[METRIC_COLS].mean(axis=1).round(1).astype("float32")
+    # low-cardinality labels: categorical codes instead of per-row Python strings
+    for c in ("org", "country"):
+        df[c] = df[c].astype("category")
+    # global KPIs and alerts are computed here so cache hits skip the column scans
+    scores = _widen_scores(df)
+    global_index = float(scores["Earth3_Index"].mean().round(1))
+    num_green = int((df["Earth3_Index"] >= 70).sum())
+    num_red = int((df["Earth3_Index"] < 65).sum())
+    alert_frames = []
+    for col, threshold, reason, label in ALERT_RULES:
+        hits = scores.loc[scores[col] < threshold, ["org"]]
+        hits["reason"] = reason
+        hits["detail"] = label + " " + scores.loc[hits.index, col].astype(str)
+        alert_frames.append(hits)
+    # stable sort on the row index keeps alerts grouped per entity, in rule order
+    alerts = pd.concat(alert_frames).sort_index(kind="stable")
+    alerts = [(str(org), reason, detail) for org, reason, detail in alerts.itertuples(index=False)]
+    return df, global_index, num_green, num_red, alerts
+
+@st.cache_resource
+def get_org_lookup():
+    # org name -> row dict for O(1) selection; cache_resource shares one instance, treat it as read-only
+    return _widen_scores(get_fake_orgs()[0]).set_index("org", drop=False).to_dict(orient="index")
 
-ORGS_DF = get_fake_orgs()
+ORGS_DF, global_index, num_green, num_red, alerts = get_fake_orgs()
+ORG_LOOKUP = get_org_lookup()
 
 # -------------------------
 # Root header + executive summary
@@ -67,37 +106,34 @@ st.markdown('<div class="lead">Governance that corrects itself — quick board s
 st.markdown("---")
 
 # top KPI row: global index, healthy count, alerts
-global_index = ORGS_DF["Earth3_Index"].mean().round(1)
-num_green = (ORGS_DF["Earth3_Index"] >= 70).sum()
-num_red = (ORGS_DF["Earth3_Index"] < 65).sum()
-
 k1, k2, k3, k4 = st.columns([1.5,1,1,1])
+# one markdown call per card: each call is a separate frontend element/delta
 with k1:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<div class='small'>Earth 3.0 Global Index</div>", unsafe_allow_html=True)
-    st.markdown(f"<div class='kpi'>{global_index}%</div>", unsafe_allow_html=True)
-    st.markdown("<div class='small'>Average readiness across monitored entities</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("<div class='card'>"
+                "<div class='small'>Earth 3.0 Global Index</div>"
+                f"<div class='kpi'>{global_index}%</div>"
+                "<div class='small'>Average readiness across monitored entities</div>"
+                "</div>", unsafe_allow_html=True)
 with k2:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<div class='small'>Healthy Entities (Index ≥ 70)</div>", unsafe_allow_html=True)
-    st.markdown(f"<div class='kpi' style='color:#065f46'>{num_green}</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("<div class='card'>"
+                "<div class='small'>Healthy Entities (Index ≥ 70)</div>"
+                f"<div class='kpi' style='color:#065f46'>{num_green}</div>"
+                "</div>", unsafe_allow_html=True)
 with k3:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<div class='small'>At-risk Entities (Index < 65)</div>", unsafe_allow_html=True)
-    st.markdown(f"<div class='kpi' style='color:#b91c1c'>{num_red}</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("<div class='card'>"
+                "<div class='small'>At-risk Entities (Index < 65)</div>"
+                f"<div class='kpi' style='color:#b91c1c'>{num_red}</div>"
+                "</div>", unsafe_allow_html=True)
 with k4:
-    st.markdown("<div class='card'>", unsafe_allow_html=True)
-    st.markdown("<div class='small'>Last Updated</div>", unsafe_allow_html=True)
-    st.markdown(f"<div class='kpi'>{datetime.utcnow():%b %d %Y}</div>", unsafe_allow_html=True)
-    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("<div class='card'>"
+                "<div class='small'>Last Updated</div>"
+                f"<div class='kpi'>{datetime.utcnow():%b %d %Y}</div>"
+                "</div>", unsafe_allow_html=True)
 
 st.markdown("---")
 
 # -------------------------
-# Controls & selection
+# Controls
 # -------------------------
 left, right = st.columns([2,1])
 with left:
@@ -105,32 +141,35 @@ with left:
     st.markdown("Click 'Show Live Twin' to open the risk hotspot map. Hover markers for quick metrics.")
 with right:
     st.markdown("### Controls")
-    org_choice = st.selectbox("Select entity (quick view)", options=ORGS_DF["org"].tolist())
     show_map_btn = st.button("🌐 Show Live Twin (Map)")
 
 # -------------------------
 # Show map (in-app) when button clicked or always show below selection
 # -------------------------
-def build_map(df):
+@st.cache_data
+def build_map():
+    # no arguments: the dataset is static (built once by the cached get_fake_orgs), so the figure is built once
+    import plotly.express as px
+    df = _widen_scores(ORGS_DF)
     # color: red if Earth3_Index < 65, amber if 65-70, green otherwise
-    def status_color(val):
-        if val < 65:
-            return "red"
-        if val < 70:
-            return "orange"
-        return "green"
-    df = df.copy()
-    df["status"] = df["Earth3_Index"].apply(lambda v: status_color(v))
-    df["text"] = df.apply(lambda r: f"{r['org']} ({r['country']})<br>Earth3 Index: {r['Earth3_Index']}<br>Finance: {r['Finance']} | AI Gov: {r['AI Governance']} | Climate: {r['Climate']}", axis=1)
-    fig = px.scatter_geo(df,
+    df["status"] = pd.cut(df["Earth3_Index"], bins=[-np.inf, 65, 70, np.inf],
+                          labels=["red", "orange", "green"], right=False).astype(str)
+    df["text"] = (df["org"].astype(str) + " (" + df["country"].astype(str) + ")<br>Earth3 Index: " + df["Earth3_Index"].astype(str)
+                  + "<br>Finance: " + df["Finance"].astype(str)
+                  + " | AI Gov: " + df["AI Governance"].astype(str)
+                  + " | Climate: " + df["Climate"].astype(str))
+    # scatter_map renders through MapLibre (WebGL), so it keeps up as the entity list grows;
+    # carto-positron tiles need no access token
+    fig = px.scatter_map(df,
                          lat="lat", lon="lon",
-                         hover_name="org",
-                         hover_data={"country":True, "Earth3_Index":True, "lat":False, "lon":False},
+                         custom_data=["text"],
                          color="status",
                          size="Earth3_Index",
-                         projection="natural earth",
+                         zoom=1,
+                         map_style="carto-positron",
                          title="")
-    fig.update_traces(marker=dict(line=dict(width=0.5, color='rgba(0,0,0,0.15)')))
+    # hover shows the prebuilt label; <extra></extra> drops the trace-name box
+    fig.update_traces(hovertemplate="%{customdata[0]}<extra></extra>")
     fig.update_layout(margin={"r":0,"t":0,"l":0,"b":0}, legend=dict(title="Status"), height=480)
     return fig
 
@@ -140,90 +179,104 @@ if show_map_btn:
 
 # Also show map if user selects an org and wants to view (makes it discoverable)
 if map_shown:
-    st.plotly_chart(build_map(ORGS_DF), use_container_width=True)
+    st.plotly_chart(build_map(), use_container_width=True)
 
 # -------------------------
 # Details panel for selected org
 # -------------------------
-sel = ORGS_DF[ORGS_DF["org"]==org_choice].iloc[0]
+# plotly and reportlab are imported inside the functions that need them, so the header and
+# KPI row paint before those heavy modules load (Python caches them after the first import)
+@st.cache_resource
+def _pdf_styles():
+    # built once per process and shared by every snapshot
+    from reportlab.lib.styles import getSampleStyleSheet
+    return getSampleStyleSheet()
 
-st.markdown("---")
-st.markdown(f"## {sel['org']} — Board Dashboard Snapshot")
-cols = st.columns([1,1,1,1,1])
-metrics = ["Finance","AI Governance","Climate","Equity","Sustainability"]
-for c, m in zip(cols, metrics):
-    val = sel[m]
-    color = "#065f46" if val>=70 else ("#b91c1c" if val<65 else "#b45309")
-    with c:
-        st.markdown(f"<div class='small'>{m}</div>", unsafe_allow_html=True)
-        st.markdown(f"<div style='font-weight:700;color:{color};font-size:18px'>{val}</div>", unsafe_allow_html=True)
-
-st.markdown(f"**Earth 3.0 Index — {sel['Earth3_Index']}**")
-
-# quick actions: download snapshot, show simulated trend
-c1, c2 = st.columns([1,2])
-with c1:
-    if st.button("📄 Download Snapshot (PDF)", key="download_pdf"):
-        # prepare text lines
-        lines = [
-            f"Earth 3.0 — Board Snapshot: {sel['org']}",
-            f"Country: {sel['country']}",
-            f"Generated: {datetime.utcnow():%B %d, %Y %H:%M UTC}",
-            "",
-        ]
-        for m in metrics:
-            lines.append(f"{m}: {sel[m]}")
-        lines.append(f"Earth3_Index: {sel['Earth3_Index']}")
-        # create PDF
-        buffer = io.BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        width, height = A4
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(40, height-60, f"Earth 3.0 — Board Snapshot: {sel['org']}")
-        c.setFont("Helvetica", 10)
-        y = height-90
-        for ln in lines[1:]:
-            c.drawString(40, y, ln)
-            y -= 14
-        c.showPage()
-        c.save()
-        buffer.seek(0)
-        st.download_button("Download PDF", data=buffer.read(), file_name=f"{sel['org']}_earth3_snapshot.pdf", mime="application/pdf")
-with c2:
-    st.markdown("### Simulated Trend (12 months)")
+def _make_doc(buffer):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+    return SimpleDocTemplate(buffer, pagesize=A4, leftMargin=40, rightMargin=40, topMargin=40, bottomMargin=40)
+
+@st.cache_data
+def render_snapshot_pdf(org, country, metric_values, index, generated_utc_day):
+    # cached per org and UTC day: repeated clicks reuse the bytes, a new day rebuilds the PDF
+    from reportlab.platypus import Paragraph, Spacer
+    styles = _pdf_styles()
+    body = styles["BodyText"]
+    flowables = [
+        Paragraph(escape(f"Earth 3.0 — Board Snapshot: {org}"), styles["Title"]),
+        Paragraph(escape(f"Country: {country}"), body),
+        Paragraph(f"Generated: {generated_utc_day:%B %d, %Y} (UTC)", body),
+        Spacer(1, 12),
+        *[Paragraph(escape(f"{m}: {v}"), body) for m, v in metric_values],
+        Paragraph(f"Earth3_Index: {index}", body),
+    ]
+    buffer = io.BytesIO()
+    _make_doc(buffer).build(flowables)
+    return buffer.getvalue()
+
+@st.cache_data
+def make_trend_fig(org_name, seed_key, end_date):
+    # cached per org (and day, since the months end today); cache_data hands back a fresh copy each call
     # fake time series for selected org: just use random around its values
-    np.random.seed(int(sel["Earth3_Index"]*10))
-    months = pd.date_range(end=datetime.utcnow().date(), periods=12, freq='M')
-    trend = pd.DataFrame({
-        "Date": months,
-        "Governance": np.clip(np.linspace(sel["AI Governance"]-6, sel["AI Governance"]+6, 12) + np.random.normal(0,2,12), 0,100).round(1),
-        "ESG": np.clip(np.linspace(sel["Sustainability"]-6, sel["Sustainability"]+6, 12) + np.random.normal(0,2,12), 0,100).round(1),
-        "Finance": np.clip(np.linspace(sel["Finance"]-6, sel["Finance"]+6, 12) + np.random.normal(0,2,12), 0,100).round(1),
-    })
+    import plotly.express as px
+    row = ORG_LOOKUP[org_name]
+    # local PCG64 generator: no shared global seed for concurrent sessions to clobber
+    rng = np.random.default_rng(int(seed_key*10))
+    months = pd.date_range(end=end_date, periods=12, freq='M')
+    # one (3, 12) matrix for Governance/ESG/Finance: centers broadcast over a shared ±6 ramp plus noise
+    centers = np.array([row["AI Governance"], row["Sustainability"], row["Finance"]], dtype=float)[:, None]
+    offsets = np.linspace(-6, 6, 12)[None, :]
+    vals = np.clip(centers + offsets + rng.normal(0, 2, size=(3, 12)), 0, 100).round(1)
+    trend = pd.DataFrame({"Date": months, "Governance": vals[0], "ESG": vals[1], "Finance": vals[2]})
     fig = px.line(trend, x="Date", y=["Governance","ESG","Finance"], labels={"value":"Index", "variable":"Metric"})
     fig.update_layout(height=320, margin=dict(l=0,r=0,t=10,b=0))
-    st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
+    return fig
+
+# st.fragment: changing the selected entity reruns only this panel, not the KPIs, map and alerts
+@st.fragment
+def render_detail():
+    st.markdown("---")
+    org_choice = st.selectbox("Select entity (quick view)", options=ORGS_DF["org"].tolist())
+    sel = ORG_LOOKUP[org_choice]
+
+    st.markdown(f"## {sel['org']} — Board Dashboard Snapshot")
+    cols = st.columns([1,1,1,1,1])
+    for c, m in zip(cols, METRIC_COLS):
+        val = sel[m]
+        color = "#065f46" if val>=70 else ("#b91c1c" if val<65 else "#b45309")
+        with c:
+            st.markdown(f"<div class='small'>{m}</div>"
+                        f"<div style='font-weight:700;color:{color};font-size:18px'>{val}</div>", unsafe_allow_html=True)
+
+    st.markdown(f"**Earth 3.0 Index — {sel['Earth3_Index']}**")
+
+    # quick actions: download snapshot, show simulated trend
+    c1, c2 = st.columns([1,2])
+    with c1:
+        # single download button: bytes come from the per-org cache, no extra click/rerun needed
+        pdf_bytes = render_snapshot_pdf(sel["org"], sel["country"],
+                                        tuple((m, float(sel[m])) for m in METRIC_COLS),
+                                        float(sel["Earth3_Index"]), datetime.utcnow().date())
+        st.download_button("📄 Download Snapshot (PDF)", data=pdf_bytes, file_name=f"{sel['org']}_earth3_snapshot.pdf",
+                           mime="application/pdf", key="download_pdf")
+    with c2:
+        st.markdown("### Simulated Trend (12 months)")
+        st.plotly_chart(make_trend_fig(sel["org"], float(sel["Earth3_Index"]), datetime.utcnow().date()),
+                        use_container_width=True, config={"displayModeBar": False})
+
+render_detail()
 
 # -------------------------
 # Alerts panel (CEO view)
 # -------------------------
 st.markdown("---")
 st.markdown("### 🔔 Executive Alerts (simulated)")
-# alerts: list entities with index < 65 or with AI Governance < 60 or Climate < 60
-alerts = []
-for _, r in ORGS_DF.iterrows():
-    if r["Earth3_Index"] < 65:
-        alerts.append((r["org"], "Low overall readiness", f"Index {r['Earth3_Index']}"))
-    if r["AI Governance"] < 60:
-        alerts.append((r["org"], "AI governance weak", f"AI Gov {r['AI Governance']}"))
-    if r["Climate"] < 60:
-        alerts.append((r["org"], "Climate resilience low", f"Climate {r['Climate']}"))
-
 if not alerts:
     st.success("No critical alerts detected across monitored entities.")
 else:
-    for a in alerts:
-        st.markdown(f"- **{a[0]}** — {a[1]} ({a[2]})")
+    for org, reason, detail in alerts:
+        st.markdown(f"- **{org}** — {reason} ({detail})")
 
 # -------------------------
 # Bottom: CEO checklist and closing